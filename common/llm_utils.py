@@ -25,55 +25,107 @@ Usage (async):
 
 from __future__ import annotations
 
+import functools
 import os
+from types import SimpleNamespace
 from typing import Any, Optional, Dict, List
 from pathlib import Path
-from dotenv import load_dotenv
 
 # ------------------------------
 # Environment & configuration
 # ------------------------------
+# The .env file is loaded on first use (not at import), so importing this module
+# stays cheap for services starting up and for test collection. Settings are parsed
+# once per process and cached.
 
 ROOT = Path(__file__).resolve().parents[1]
-load_dotenv(dotenv_path=ROOT / ".env", override=True)
-
-USE_MOCK: bool = os.getenv("OPENAI_OFFLINE", "0") == "1"
 OPENAI_MODEL = "gpt-3.5-turbo"
-DEFAULT_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-DEFAULT_TIMEOUT_S: float = float(os.getenv("OPENAI_TIMEOUT_S", "30"))
-DEFAULT_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
-BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL") or None
+
+
+@functools.cache
+def load_env() -> None:
+    """
+    Load the repo-root .env into os.environ, once per process.
+    Services call this before reading their own env settings.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=ROOT / ".env", override=True)
+
+
+@functools.cache
+def _settings() -> SimpleNamespace:
+    """
+    Load the repo-root .env and parse LLM settings, once per process.
+    Everything env-driven in this module reads from here.
+    """
+    load_env()
+    return SimpleNamespace(
+        use_mock=os.getenv("OPENAI_OFFLINE", "0") == "1",
+        api_key=os.getenv("OPENAI_API_KEY"),
+        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        timeout_s=float(os.getenv("OPENAI_TIMEOUT_S", "30")),
+        max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+    )
+
+
+# Connection pool tuning (shared by sync + async clients). Reusing keep-alive
+# connections avoids a fresh TCP + TLS handshake on every call.
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 50
+HTTP_KEEPALIVE_EXPIRY_S = 30.0
+HTTP_CONNECT_TIMEOUT_S = 5.0
 
 # Cached clients (lazy init). We keep these None until actually needed.
 _client = None
 _async_client = None
 
-__all__ = ["complete", "acomplete"]
+__all__ = ["complete", "acomplete", "aclose", "load_env"]
 
 
 # ------------------------------
 # Client constructors (lazy)
 # ------------------------------
 
+def _http_pool_kwargs() -> Dict[str, Any]:
+    """Shared `limits=` / `timeout=` kwargs for the underlying httpx clients."""
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+        "timeout": httpx.Timeout(_settings().timeout_s, connect=HTTP_CONNECT_TIMEOUT_S),
+    }
+
+
 def _get_client():
     """
     Lazily construct and cache the OpenAI sync client.
     Imported inside the function so module import remains cheap and test-friendly.
     """
     global _client
-    if USE_MOCK:
+    if _settings().use_mock:
         return None
     if _client is not None:
         return _client
 
     # Local import to avoid import-time dependency in mock mode
+    import httpx
     from openai import OpenAI
 
-    api_key = os.getenv("OPENAI_API_KEY")
+    api_key = _settings().api_key
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set. Put it in .env or set the env var.")
 
-    _client = OpenAI(api_key=api_key, base_url=BASE_URL)
+    _client = OpenAI(
+        api_key=api_key,
+        base_url=_settings().base_url,
+        http_client=httpx.Client(**_http_pool_kwargs()),
+    )
     return _client
 
 
@@ -82,21 +134,40 @@ def _get_async_client():
     Lazily construct and cache the OpenAI async client.
     """
     global _async_client
-    if USE_MOCK:
+    if _settings().use_mock:
         return None
     if _async_client is not None:
         return _async_client
 
+    import httpx
     from openai import AsyncOpenAI
 
-    api_key = os.getenv("OPENAI_API_KEY")
+    api_key = _settings().api_key
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set. Put it in .env or set the env var.")
 
-    _async_client = AsyncOpenAI(api_key=api_key, base_url=BASE_URL)
+    _async_client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=_settings().base_url,
+        http_client=httpx.AsyncClient(**_http_pool_kwargs()),
+    )
     return _async_client
 
 
+async def aclose() -> None:
+    """
+    Close cached clients and their connection pools.
+    Call from a FastAPI shutdown hook so long-lived processes don't leak sockets.
+    """
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
 # ------------------------------
 # Retry helpers (sync + async)
 # ------------------------------
@@ -111,6 +182,20 @@ def _retryable_exceptions():
     return (APIConnectionError, APITimeoutError, RateLimitError, APIError)
 
 
+def _retry_policy(max_retries: int, wait: Any) -> Dict[str, Any]:
+    """
+    Shared tenacity kwargs for sync and async calls; each path supplies its own `wait`.
+    """
+    from tenacity import stop_after_attempt, retry_if_exception_type
+
+    return {
+        "reraise": True,
+        "stop": stop_after_attempt(max_retries + 1),            # attempts = 1 + retries
+        "wait": wait,
+        "retry": retry_if_exception_type(_retryable_exceptions()),
+    }
+
+
 # ------------------------------
 # Offline mock (used by tests)
 # ------------------------------
@@ -130,14 +215,26 @@ _MOCK_TS_SNIPPET = (
 # Public APIs
 # ------------------------------
 
+def _resolve_defaults(model: Optional[str], timeout_s: Optional[float], max_retries: Optional[int]):
+    """Fill unset call options from the cached settings."""
+    settings = _settings()
+    if model is None:
+        model = settings.model
+    if timeout_s is None:
+        timeout_s = settings.timeout_s
+    if max_retries is None:
+        max_retries = settings.max_retries
+    return model, timeout_s, max_retries
+
+
 def complete(
     user_prompt: str,
     system_prompt: Optional[str] = None,
     *,
-    model: str = DEFAULT_MODEL,
+    model: Optional[str] = None,
     temperature: Optional[float] = 0.2,
-    timeout_s: float = DEFAULT_TIMEOUT_S,
-    max_retries: int = DEFAULT_MAX_RETRIES,
+    timeout_s: Optional[float] = None,
+    max_retries: Optional[int] = None,
     extra_messages: Optional[List[Dict[str, Any]]] = None,
     **kwargs: Any,
 ) -> str:
@@ -150,14 +247,14 @@ def complete(
         Main user instruction/content.
     system_prompt : Optional[str]
         Optional system message (persona/constraints).
-    model : str
+    model : Optional[str]
         Model to use (default from env).
     temperature : Optional[float]
         Temperature to pass; set None to omit.
-    timeout_s : float
-        Per-request timeout in seconds.
-    max_retries : int
-        Number of retry attempts on transient errors.
+    timeout_s : Optional[float]
+        Per-request timeout in seconds (default from env).
+    max_retries : Optional[int]
+        Number of retry attempts on transient errors (default from env).
     extra_messages : Optional[List[Dict[str, Any]]]
         Extra messages to prepend/append (advanced).
 
@@ -166,21 +263,18 @@ def complete(
     str
         The assistant message content.
     """
-    if USE_MOCK:
+    if _settings().use_mock:
         return _MOCK_TS_SNIPPET
 
+    model, timeout_s, max_retries = _resolve_defaults(model, timeout_s, max_retries)
+
     client = _get_client()
     # Bind timeout per request without mutating the global client
     client_req = client.with_options(timeout=timeout_s)
 
-    from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+    from tenacity import retry, wait_exponential
 
-    @retry(
-        reraise=True,
-        stop=stop_after_attempt(max_retries + 1),            # attempts = 1 + retries
-        wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
-        retry=retry_if_exception_type(_retryable_exceptions()),
-    )
+    @retry(**_retry_policy(max_retries, wait_exponential(multiplier=0.5, min=0.5, max=8)))
     def _do_request() -> str:
         messages: List[Dict[str, Any]] = []
         if system_prompt:
@@ -204,10 +298,10 @@ async def acomplete(
     user_prompt: str,
     system_prompt: Optional[str] = None,
     *,
-    model: str = DEFAULT_MODEL,
+    model: Optional[str] = None,
     temperature: Optional[float] = 0.2,
-    timeout_s: float = DEFAULT_TIMEOUT_S,
-    max_retries: int = DEFAULT_MAX_RETRIES,
+    timeout_s: Optional[float] = None,
+    max_retries: Optional[int] = None,
     extra_messages: Optional[List[Dict[str, Any]]] = None,
     **kwargs: Any,
 ) -> str:
@@ -216,33 +310,33 @@ async def acomplete(
 
     Mirrors `complete` but uses `AsyncOpenAI` and async tenacity retry.
     """
-    if USE_MOCK:
+    if _settings().use_mock:
         return _MOCK_TS_SNIPPET
 
+    model, timeout_s, max_retries = _resolve_defaults(model, timeout_s, max_retries)
+
     client = _get_async_client()
     client_req = client.with_options(timeout=timeout_s)
 
     # Async retry: import inside to avoid top-level dependency
-    from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential, retry_if_exception_type
-
-    async for attempt in AsyncRetrying(
-        reraise=True,
-        stop=stop_after_attempt(max_retries + 1),
-        wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
-        retry=retry_if_exception_type(_retryable_exceptions()),
-    ):
-        with attempt:
-            messages: List[Dict[str, Any]] = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            if extra_messages:
-                messages.extend(extra_messages)
-            messages.append({"role": "user", "content": user_prompt})
-
-            resp = await client_req.chat.completions.create(
-                model=model,
-                messages=messages,
-                **{k: v for k, v in kwargs.items() if v is not None},
-                **({"temperature": temperature} if temperature is not None else {}),
-            )
-            return resp.choices[0].message.content
+    from tenacity import retry, wait_exponential_jitter
+
+    # Jittered backoff so concurrent async callers that fail together don't retry in lockstep
+    @retry(**_retry_policy(max_retries, wait_exponential_jitter(initial=1, max=30, jitter=0.5)))
+    async def _do_request() -> str:
+        messages: List[Dict[str, Any]] = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        if extra_messages:
+            messages.extend(extra_messages)
+        messages.append({"role": "user", "content": user_prompt})
+
+        resp = await client_req.chat.completions.create(
+            model=model,
+            messages=messages,
+            **{k: v for k, v in kwargs.items() if v is not None},
+            **({"temperature": temperature} if temperature is not None else {}),
+        )
+        return resp.choices[0].message.content
+
+    return await _do_request()
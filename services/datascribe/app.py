@@ -4,73 +4,160 @@ DataScribe Agent
 Translates a natural-language analytics question into SQL (for SQLite demo),
 executes it, and returns rows. This demonstrates NL->SQL planning and simple data access.
 
-Endpoint:
-- POST /query  -> { question } -> { sql, rows }
+Endpoints:
+- POST /query        -> { question }   -> { sql, rows }
+- POST /query_batch  -> [ { question } ] -> [ { sql, rows } | { error } ]
 """
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from cachetools import TTLCache
+from typing import List
+import asyncio
+import functools
+import logging
+import os
 import sqlite3
-import pandas as pd
-from common.llm_utils import complete
+import threading
+from common.llm_utils import acomplete, aclose, load_env
+from .seed_test_data import seed
 import re
 from pathlib import Path
-import subprocess
-import sys
+from types import SimpleNamespace
 import traceback
 
 # ---- Paths resolved relative to this file ----
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "datascribe_demo.db"        # created by the seeding script
-SEED_PATH = BASE_DIR / "seed_test_data.py"
+DB_PATH = BASE_DIR / "datascribe_demo.db"        # created by seed_test_data.seed()
 
-app = FastAPI(title="DataScribe Agent")
+logger = logging.getLogger(__name__)
+
+
+@functools.cache
+def _config() -> SimpleNamespace:
+    """
+    DataScribe settings, read once on first use (after the repo-root .env is loaded,
+    so importing this module stays cheap).
+      DATASCRIBE_DEBUG=1            -> SQL failures include a formatted traceback (dev only)
+      DATASCRIBE_LLM_CONCURRENCY=N  -> max concurrent LLM calls per worker (default 8)
+    """
+    load_env()
+    return SimpleNamespace(
+        debug=os.getenv("DATASCRIBE_DEBUG") == "1",
+        llm_concurrency=int(os.getenv("DATASCRIBE_LLM_CONCURRENCY", "8")),
+    )
+
+
+@functools.cache
+def _llm_semaphore() -> asyncio.Semaphore:
+    """Caps concurrent LLM calls (shared by /query and /query_batch) to stay under provider rate limits."""
+    return asyncio.Semaphore(_config().llm_concurrency)
+
+# orjson: faster serialization for row-heavy responses
+app = FastAPI(title="DataScribe Agent", default_response_class=ORJSONResponse)
 
 
 class NLQuery(BaseModel):
     question: str  # e.g., "Total revenue by sku for February 2025, highest first"
 
 
+# Static system prompt (schema + rules). It is sent unchanged as the leading message on
+# every call, so it forms a stable prefix for provider-side prompt caching; the user
+# message is just the question.
 SQL_SYS = """Translate natural-language questions to valid SQLite SQL.
 Rules:
 - Use table: sales(day TEXT, sku TEXT, qty INT, price REAL)
 - Return a single SELECT query only (no semicolons, no DDL/DML).
 - Prefer readable column aliases.
+- Reply with the SQL only: no explanations, no code fences.
 """
 
 
+# Precompiled patterns for SQL normalization / guardrails (hot path on every /query)
+_FENCE_OPEN = re.compile(r"^```(?:sql)?\s*", re.IGNORECASE)
+_FENCE_CLOSE = re.compile(r"\s*```$")
+_LABEL = re.compile(r"^\s*SQL\s*:\s*", re.IGNORECASE)
+_SELECT = re.compile(r"^\s*select\b", re.IGNORECASE)
+# Whole-word match so identifiers like "updated_at" don't trip the guardrail
+_BANNED = re.compile(r"\b(insert|update|delete|drop|create|alter|truncate)\b", re.IGNORECASE)
+
+# Shared read-only connection (lazy). The workload is pure reads, so one
+# connection is reused across requests; the lock serializes access to it.
+_RO_CON: sqlite3.Connection | None = None
+_DB_LOCK = threading.Lock()
+# ensure_db() runs in the threadpool; only one thread may (re)seed at a time
+_SEED_LOCK = threading.Lock()
+
+
+# NL -> SQL translations keyed by normalized question. The schema prompt is fixed,
+# so repeat questions can skip the LLM round-trip.
+_SQL_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_CACHE_LOCK = threading.Lock()
+
+
+# -------------------- DB connection helpers --------------------
+def _ro_con() -> sqlite3.Connection:
+    """Return the cached read-only connection, opening it on first use. Call with _DB_LOCK held."""
+    global _RO_CON
+    if _RO_CON is None:
+        _RO_CON = sqlite3.connect(f"{DB_PATH.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    return _RO_CON
+
+
+def _close_ro_con() -> None:
+    """Drop the cached connection (e.g., before reseeding or on shutdown)."""
+    global _RO_CON
+    with _DB_LOCK:
+        if _RO_CON is not None:
+            _RO_CON.close()
+            _RO_CON = None
+
+
 # -------------------- DB seeding helpers --------------------
 def _db_needs_seed() -> bool:
     """Return True if the database doesn't exist, lacks the sales table, or is empty."""
     if not DB_PATH.exists():
         return True
-    con = sqlite3.connect(str(DB_PATH))
     try:
-        cur = con.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sales'")
-        if cur.fetchone() is None:
-            return True
-        cur.execute("SELECT COUNT(*) FROM sales")
-        (n,) = cur.fetchone()
-        return n == 0
+        with _DB_LOCK:
+            cur = _ro_con().cursor()
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sales'")
+            if cur.fetchone() is None:
+                return True
+            cur.execute("SELECT COUNT(*) FROM sales")
+            (n,) = cur.fetchone()
+            return n == 0
     except Exception:
         # Any unexpected issue -> reseed
         return True
-    finally:
-        con.close()
 
 
 def ensure_db():
     """
-    Ensure the demo DB exists and is populated by invoking seed_test_data.py.
-    Keeps the seed logic in a single source of truth (the script).
+    Ensure the demo DB exists and is populated by calling seed_test_data.seed() in-process.
+    Keeps the seed logic in a single source of truth (the seeding module).
     """
-    if _db_needs_seed():
-        subprocess.run([sys.executable, str(SEED_PATH)], cwd=str(BASE_DIR), check=True)
+    if not _db_needs_seed():
+        return
+    with _SEED_LOCK:
+        if _db_needs_seed():  # re-check: another thread may have seeded meanwhile
+            # The seeder may recreate the file; reopen the read-only connection afterwards.
+            _close_ro_con()
+            seed(str(DB_PATH))
 
 
 @app.on_event("startup")
 def _startup():
     ensure_db()
+    with _DB_LOCK:
+        _ro_con()  # open the shared read-only connection up front
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    _close_ro_con()
+    await aclose()
 
 
 # -------------------- Utilities --------------------
@@ -80,11 +167,11 @@ def _sanitize_sql(raw: str) -> str:
 
     # Strip ```sql ... ``` or ``` ... ```
     if s.startswith("```"):
-        s = re.sub(r"^```(?:sql)?\s*", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"\s*```$", "", s)
+        s = _FENCE_OPEN.sub("", s)
+        s = _FENCE_CLOSE.sub("", s)
 
     # Remove leading "SQL:" label if present
-    s = re.sub(r"^\s*SQL\s*:\s*", "", s, flags=re.IGNORECASE).strip()
+    s = _LABEL.sub("", s).strip()
 
     # If there are multiple statements separated by semicolons, keep only the first
     if ";" in s:
@@ -94,27 +181,28 @@ def _sanitize_sql(raw: str) -> str:
 
 
 def _execute_sql(sql: str) -> list[dict]:
-    con = sqlite3.connect(str(DB_PATH))
-    try:
-        df = pd.read_sql_query(sql, con)
-        return df.to_dict(orient="records")
-    finally:
-        con.close()
+    with _DB_LOCK:
+        cur = _ro_con().execute(sql)
+        cols = [d[0] for d in cur.description or ()]
+        rows = cur.fetchall()
+    return [dict(zip(cols, r)) for r in rows]
 
 
-# -------------------- API --------------------
-@app.post("/query")
-def query(nl: NLQuery):
-    """
-    Convert NL to SQL and run it against SQLite demo DB.
-    """
-    ensure_db()  # defensive (also done on startup)
+def _cache_key(question: str) -> str:
+    """Case/whitespace-insensitive cache key for a question."""
+    return " ".join(question.lower().split())
 
-    question = (nl.question or "").strip()
 
+# -------------------- Core --------------------
+async def _translate(question: str) -> tuple[str, str]:
+    """
+    Ask the LLM for SQL, normalize it, and apply guardrails.
+    Returns (raw_model_sql, sanitized_sql); raises HTTPException on LLM or guardrail failures.
+    """
     # 1) Call LLM (no fallback).
     try:
-        raw_model_sql = complete(f"Question:\n{question}\nReturn only SQL:", SQL_SYS)
+        async with _llm_semaphore():
+            raw_model_sql = await acomplete(question, SQL_SYS)
     except Exception as e:
         # Distinguish LLM/request errors from SQL/runtime errors.
         raise HTTPException(
@@ -138,8 +226,7 @@ def query(nl: NLQuery):
     sanitized_sql = _sanitize_sql(sanitized_sql)
 
     # 3) Guardrails: require SELECT and block DDL/DML keywords
-    lowered = sanitized_sql.lower()
-    if not re.match(r"^\s*select\b", lowered):
+    if not _SELECT.match(sanitized_sql):
         raise HTTPException(
             status_code=400,
             detail={
@@ -150,7 +237,7 @@ def query(nl: NLQuery):
             },
         )
 
-    if any(word in lowered for word in ["insert", "update", "delete", "drop", "create", "alter", "truncate"]):
+    if _BANNED.search(sanitized_sql):
         raise HTTPException(
             status_code=400,
             detail={
@@ -160,20 +247,80 @@ def query(nl: NLQuery):
             },
         )
 
+    return raw_model_sql, sanitized_sql
+
+
+async def _answer(question: str, use_cache: bool = True) -> dict:
+    """
+    Translate one question to SQL (cached), then execute it.
+    Raises HTTPException on LLM, guardrail, or SQL failures.
+    """
+    question = (question or "").strip()
+    key = _cache_key(question)
+
+    sanitized_sql = None
+    if use_cache:
+        with _CACHE_LOCK:
+            sanitized_sql = _SQL_CACHE.get(key)
+
+    if sanitized_sql is None:
+        raw_model_sql, sanitized_sql = await _translate(question)
+        with _CACHE_LOCK:
+            _SQL_CACHE[key] = sanitized_sql
+    else:
+        raw_model_sql = sanitized_sql
+
     # 4) Execute SQL and return rows (verbose errors on failure)
     try:
-        rows = _execute_sql(sanitized_sql)
+        # SQLite calls block; run them off the event loop so slow queries don't stall other requests
+        rows = await run_in_threadpool(_execute_sql, sanitized_sql)
         return {"sql": sanitized_sql, "rows": rows}
     except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "message": "SQL execution failed.",
-                "raw_model_sql": raw_model_sql,
-                "sanitized_sql_tried": sanitized_sql,
-                "exception": f"{e.__class__.__name__}: {str(e)}",
-                "traceback": traceback.format_exc(),
-                "db_path": str(DB_PATH),
-                "hint": "Inspect the sanitized_sql and confirm the schema: sales(day TEXT, sku TEXT, qty INT, price REAL).",
-            },
-        )
+        # Don't keep serving SQL that fails; the next request goes back to the LLM.
+        with _CACHE_LOCK:
+            _SQL_CACHE.pop(key, None)
+        logger.exception("SQL execution failed: %s", sanitized_sql)
+        detail = {
+            "message": "SQL execution failed.",
+            "raw_model_sql": raw_model_sql,
+            "sanitized_sql_tried": sanitized_sql,
+            "exception": f"{e.__class__.__name__}: {str(e)}",
+            "db_path": str(DB_PATH),
+            "hint": "Inspect the sanitized_sql and confirm the schema: sales(day TEXT, sku TEXT, qty INT, price REAL).",
+        }
+        if _config().debug:
+            detail["traceback"] = traceback.format_exc()
+        raise HTTPException(status_code=400, detail=detail)
+
+
+# -------------------- API --------------------
+@app.post("/query")
+async def query(nl: NLQuery, no_cache: bool = False):
+    """
+    Convert NL to SQL and run it against SQLite demo DB.
+    Pass ?no_cache=true to skip the cached translation and ask the LLM again.
+    """
+    await run_in_threadpool(ensure_db)  # defensive (also done on startup)
+    return await _answer(nl.question, use_cache=not no_cache)
+
+
+@app.post("/query_batch")
+async def query_batch(items: List[NLQuery], no_cache: bool = False):
+    """
+    Answer several questions concurrently. LLM calls overlap (bounded by the shared
+    semaphore); each item yields either { sql, rows } or { error } without failing the batch.
+    """
+    await run_in_threadpool(ensure_db)
+    results = await asyncio.gather(
+        *[_answer(q.question, use_cache=not no_cache) for q in items], return_exceptions=True
+    )
+
+    out = []
+    for res in results:
+        if isinstance(res, HTTPException):
+            out.append({"error": res.detail, "status_code": res.status_code})
+        elif isinstance(res, Exception):
+            out.append({"error": f"{res.__class__.__name__}: {res}", "status_code": 500})
+        else:
+            out.append(res)
+    return out
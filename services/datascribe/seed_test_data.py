@@ -1,31 +1,46 @@
 import sqlite3, random, datetime
+from pathlib import Path
 
-con = sqlite3.connect("datascribe_demo.db")
-c = con.cursor()
-
-c.execute("drop table if exists sales")
-c.execute("""
-CREATE TABLE sales(
-    id INTEGER PRIMARY KEY,
-    day TEXT,
-    sku TEXT,
-    qty INTEGER,
-    price REAL
-)
-""")
-
-start = datetime.date(2025, 1, 1)
-
-for i in range(400):
-    d = start + datetime.timedelta(days=i % 180)
-    sku = f"SKU{1 + (i % 8)}"
-    qty = random.randint(1, 10)
-    price = random.choice([9.99, 14.5, 19.0, 29.0])
-    c.execute(
-        "INSERT INTO sales(day, sku, qty, price) VALUES (?, ?, ?, ?)",
-        (str(d), sku, qty, price)
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / "datascribe_demo.db"
+
+
+def seed(db_path=DEFAULT_DB_PATH):
+    """(Re)create the demo `sales` table at db_path with 400 random rows."""
+    con = sqlite3.connect(str(db_path))
+    # Throwaway demo data: skip durability work while seeding
+    con.execute("PRAGMA journal_mode=MEMORY")
+    con.execute("PRAGMA synchronous=OFF")
+    c = con.cursor()
+
+    c.execute("drop table if exists sales")
+    c.execute("""
+    CREATE TABLE sales(
+        id INTEGER PRIMARY KEY,
+        day TEXT,
+        sku TEXT,
+        qty INTEGER,
+        price REAL
     )
+    """)
+
+    start = datetime.date(2025, 1, 1)
+
+    rows = [
+        (
+            str(start + datetime.timedelta(days=i % 180)),
+            f"SKU{1 + (i % 8)}",
+            random.randint(1, 10),
+            random.choice([9.99, 14.5, 19.0, 29.0]),
+        )
+        for i in range(400)
+    ]
+
+    # One transaction, one prepared statement
+    c.execute("BEGIN")
+    c.executemany("INSERT INTO sales(day, sku, qty, price) VALUES (?, ?, ?, ?)", rows)
+    con.commit()
+    con.close()
 
-con.commit()
-con.close()
-print("Seeded datascribe_demo.db with 400 rows.")
+if __name__ == "__main__":
+    seed()
+    print("Seeded datascribe_demo.db with 400 rows.")
@@ -5,65 +5,226 @@ Turns a natural-language test idea into a Playwright Test (TypeScript) file,
 then lets you run it headless via Playwright runner.
 
 Endpoints:
-- POST /generate  -> NL spec -> TS test file
-- POST /run       -> executes tests (returns summary)
+- POST /generate  -> NL spec -> TS test file (tests/generated-<hash>.spec.ts)
+- POST /run       -> { file? } -> executes that generated file, or the most recent one if omitted (returns summary)
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from collections import deque
+from typing import Optional
+import hashlib
+import json
+import os
+import re
+import shutil
+import signal
 import subprocess
+import tempfile
+import threading
 import pathlib
-from common.llm_utils import complete
+from common.llm_utils import acomplete, aclose
 
-app = FastAPI(title="E2E Testing Agent")
+# orjson: faster JSON serialization (e.g. large output tails from /run)
+app = FastAPI(title="E2E Testing Agent", default_response_class=ORJSONResponse)
 
 # Where generated tests will be written
 TESTS_DIR = pathlib.Path(__file__).parent / "tests"
 TESTS_DIR.mkdir(parents=True, exist_ok=True)
+# Generated specs kept on disk; older ones are pruned on each /generate
+MAX_GENERATED_SPECS = 20
+
+# Only the tail of runner output is returned, so only the tail is kept in memory:
+# at most N lines per stream, each read in chunks of at most TAIL_LINE_MAX_CHARS
+# (so one huge line can't grow unbounded either).
+STDOUT_TAIL_LINES = 200
+STDERR_TAIL_LINES = 100
+TAIL_LINE_MAX_CHARS = 4000
+# Kill runaway test runs so they can't pin a worker indefinitely
+RUN_TIMEOUT_S = 300
+
+
+# Fast path: "Open <url> and assert title contains '<text>'" is common enough
+# (and simple enough) to template locally instead of asking the LLM. The title must be
+# quoted and end the spec, so multi-step specs always go to the LLM.
+_TITLE_SPEC = re.compile(
+    r"""^\s*open\s+(?P<url>\S+?)[.,]?\s+and\s+assert\s+(?:that\s+)?(?:the\s+)?title\s+contains\s+
+        (?P<q>['"])(?P<title>(?:(?!(?P=q)).)+)(?P=q)\s*\.?\s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await aclose()
 
 
 class NLTest(BaseModel):
     spec: str  # e.g., "Open example.com and assert title contains 'Example'"
 
 
-@app.post("/generate")
-def generate_test(nl: NLTest):
-    """
-    Generate a TypeScript Playwright test from natural-language instructions.
-    """
-    system = "You generate Playwright Test (TypeScript) using @playwright/test."
-    prompt = f"""
+# Static prompts (built once; only the spec is interpolated per request)
+_E2E_SYSTEM = "You generate Playwright Test (TypeScript) using @playwright/test."
+_E2E_PROMPT_TMPL = """
 Write ONE Playwright test file in TypeScript with these rules:
 - Include: import {{ test, expect }} from '@playwright/test';
 - Use test.describe(...) and test('name', async ({{ page }}) => {{ ... }});
 - Include at least one expect(...).
 Natural-language spec:
-{nl.spec}
+{spec}
 
 Return ONLY the file content. No explanations.
 """
-    ts_code = complete(prompt, system)
 
-    # Save to a fixed file name for simplicity
-    spec_path = TESTS_DIR / "generated.spec.ts"
-    spec_path.write_text(ts_code, encoding="utf-8")
+
+def _title_test_ts(url: str, title: str) -> str:
+    """Render the templated title-check test (same shape as the LLM output we ask for)."""
+    if "://" not in url:
+        url = "https://" + url
+    # json.dumps yields a valid, escaped TS string literal
+    return (
+        "import { test, expect } from '@playwright/test';\n\n"
+        f"test.describe({json.dumps(url)}, () => {{\n"
+        f"  test({json.dumps('Title contains ' + title)}, async ({{ page }}) => {{\n"
+        f"    await page.goto({json.dumps(url)});\n"
+        "    const title = await page.title();\n"
+        f"    expect(title).toContain({json.dumps(title)});\n"
+        "  });\n"
+        "});\n"
+    )
+
+
+def _generated_specs() -> list[pathlib.Path]:
+    """Generated spec files, newest first."""
+    paths = []
+    for p in TESTS_DIR.glob("generated-*.spec.ts"):
+        try:
+            paths.append((p.stat().st_mtime, p))
+        except FileNotFoundError:  # pruned concurrently
+            pass
+    return [p for _, p in sorted(paths, reverse=True)]
+
+
+def _prune_specs() -> None:
+    """Keep only the MAX_GENERATED_SPECS most recent generated specs."""
+    for old in _generated_specs()[MAX_GENERATED_SPECS:]:
+        old.unlink(missing_ok=True)
+
+
+def _save_spec(spec: str, ts_code: str) -> dict:
+    # One file per spec (named by its hash) so concurrent /generate calls don't clobber each other
+    name = hashlib.blake2b(spec.encode("utf-8"), digest_size=8).hexdigest()
+    spec_path = TESTS_DIR / f"generated-{name}.spec.ts"
+    # Write a temp file (not *.spec.ts, so Playwright ignores it) and rename atomically,
+    # so concurrent writers of the same spec never leave a half-written file
+    fd, tmp = tempfile.mkstemp(dir=TESTS_DIR, prefix=".generated-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(ts_code)
+        os.replace(tmp, spec_path)
+    except BaseException:
+        pathlib.Path(tmp).unlink(missing_ok=True)
+        raise
+    _prune_specs()
     return {"status": "ok", "file": str(spec_path)}
 
 
+@app.post("/generate")
+async def generate_test(nl: NLTest):
+    """
+    Generate a TypeScript Playwright test from natural-language instructions.
+    """
+    m = _TITLE_SPEC.match(nl.spec or "")
+    if m:
+        ts_code = _title_test_ts(m.group("url"), m.group("title"))
+        return _save_spec(nl.spec, ts_code)
+
+    ts_code = await acomplete(_E2E_PROMPT_TMPL.format(spec=nl.spec), _E2E_SYSTEM)
+    return _save_spec(nl.spec, ts_code)
+
+
+def _drain(stream, sink: deque) -> None:
+    """Consume a pipe line by line into a bounded deque (keeps only the tail)."""
+    # readline(n) returns at most n chars; longer lines arrive as several entries
+    for line in iter(lambda: stream.readline(TAIL_LINE_MAX_CHARS), ""):
+        sink.append(line)
+    stream.close()
+
+
+def _kill_tree(proc: subprocess.Popen) -> None:
+    """
+    Kill the runner and everything it spawned (Playwright workers, browsers).
+    Killing only npx would leave grandchildren running and holding our pipes open.
+    """
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)  # proc leads its own session/group (start_new_session)
+        except ProcessLookupError:
+            pass
+
+
+class RunRequest(BaseModel):
+    file: Optional[str] = None  # path returned by /generate; omit to run the most recent one
+
+
+def _resolve_spec(file: str) -> pathlib.Path:
+    """Accept only existing spec files inside TESTS_DIR (the value comes from the client)."""
+    path = pathlib.Path(file).resolve()
+    if not path.is_relative_to(TESTS_DIR.resolve()) or not path.name.endswith(".spec.ts") or not path.is_file():
+        raise HTTPException(status_code=400, detail=f"Not a generated spec under {TESTS_DIR}: {file}")
+    return path
+
+
 @app.post("/run")
-def run_tests():
+def run_tests(req: Optional[RunRequest] = None):
     """
     Run Playwright tests and return the output. Requires Node + @playwright/test installed.
+    Pass { "file": <path from /generate> } to run that spec; without it, the most recently
+    generated spec runs (or the whole tests/ folder if nothing has been generated yet).
     """
+    if req is not None and req.file:
+        target: Optional[pathlib.Path] = _resolve_spec(req.file)
+    else:
+        latest = _generated_specs()
+        target = latest[0] if latest else None
+    # Playwright treats positional args as filters on the test file path
+    cmd_filter = [target.name] if target is not None else []
+
     try:
+        # Resolve npx explicitly (npx.cmd on Windows) so no shell is needed
+        npx = shutil.which("npx") or "npx"
         # "-c services/e2e-testing" tells Playwright to use the local config in this folder
-        result = subprocess.run(
-            ["npx", "playwright", "test", "-c", str(pathlib.Path(__file__).parent)],
-            capture_output=True, text=True, shell=True
+        proc = subprocess.Popen(
+            [npx, "playwright", "test", "-c", str(pathlib.Path(__file__).parent), *cmd_filter],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            # Reporter output contains ✓/✘; never let a decode error kill a reader (and stall the pipe)
+            encoding="utf-8", errors="replace",
+            start_new_session=True,  # own process group so a timeout can kill the whole tree
         )
+        tail_out: deque = deque(maxlen=STDOUT_TAIL_LINES)
+        tail_err: deque = deque(maxlen=STDERR_TAIL_LINES)
+        readers = [
+            threading.Thread(target=_drain, args=(proc.stdout, tail_out), daemon=True),
+            threading.Thread(target=_drain, args=(proc.stderr, tail_err), daemon=True),
+        ]
+        for t in readers:
+            t.start()
+        timed_out = False
+        try:
+            returncode = proc.wait(timeout=RUN_TIMEOUT_S)
+        except subprocess.TimeoutExpired:
+            _kill_tree(proc)
+            returncode = proc.wait()
+            timed_out = True
+        for t in readers:
+            t.join()
         return {
-            "exit_code": result.returncode,
-            "stdout_tail": result.stdout[-4000:],
-            "stderr_tail": result.stderr[-2000:]
+            "exit_code": returncode,
+            "timed_out": timed_out,
+            "stdout_tail": "".join(tail_out)[-4000:],
+            "stderr_tail": "".join(tail_err)[-2000:]
         }
     except Exception as e:
         return {"error": str(e)}
@@ -9,31 +9,82 @@ Endpoint:
 """
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from common.llm_utils import complete
-import requests
+from cachetools import TTLCache
+from common.llm_utils import acomplete, aclose
+import asyncio
+import httpx
 
 app = FastAPI(title="Weather Emergency Agent")
 OPEN_METEO = "https://api.open-meteo.com/v1/forecast"
 
+# One pooled HTTP client for Open-Meteo, reused across requests (keep-alive, no per-call TLS handshake).
+# Created lazily and reset on shutdown, so the app can be started again in the same process.
+_HTTP: httpx.AsyncClient | None = None
+
+# Forecast responses keyed by (lat, lon) rounded to 2 decimals (~1 km grid), kept 10 minutes.
+# In-flight fetches are shared so concurrent requests for the same cell make one call.
+_WX: TTLCache = TTLCache(maxsize=10_000, ttl=600)
+_WX_INFLIGHT: dict[tuple[float, float], asyncio.Task] = {}
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    global _HTTP
+    if _HTTP is not None:
+        await _HTTP.aclose()
+        _HTTP = None
+    await aclose()
+
 
 class Location(BaseModel):
     lat: float
     lon: float
 
 
+def _http() -> httpx.AsyncClient:
+    """Return the shared Open-Meteo client, creating it on first use."""
+    global _HTTP
+    if _HTTP is None:
+        _HTTP = httpx.AsyncClient(timeout=20, limits=httpx.Limits(max_keepalive_connections=10))
+    return _HTTP
+
+
+async def _fetch_weather(lat: float, lon: float) -> dict:
+    r = await _http().get(OPEN_METEO, params={
+        "latitude": lat, "longitude": lon,
+        "hourly": "temperature_2m,wind_speed_10m,precipitation_probability",
+        "current_weather": True
+    })
+    r.raise_for_status()
+    return r.json()
+
+
+async def _get_weather(loc: Location) -> dict:
+    """Return cached Open-Meteo data for the location's grid cell, fetching at most once per cell."""
+    key = (round(loc.lat, 2), round(loc.lon, 2))
+    data = _WX.get(key)
+    if data is not None:
+        return data
+
+    task = _WX_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_weather(*key))
+        _WX_INFLIGHT[key] = task
+        task.add_done_callback(lambda _t: _WX_INFLIGHT.pop(key, None))
+
+    # shield: one caller disconnecting must not cancel the fetch other callers are waiting on
+    data = await asyncio.shield(task)
+    _WX[key] = data
+    return data
+
+
 @app.post("/assess")
-def assess(loc: Location):
+async def assess(loc: Location):
     """
     Get weather metrics and ask the LLM for a response plan.
     """
     try:
-        r = requests.get(OPEN_METEO, params={
-            "latitude": loc.lat, "longitude": loc.lon,
-            "hourly": "temperature_2m,wind_speed_10m,precipitation_probability",
-            "current_weather": True
-        }, timeout=20)
-        r.raise_for_status()
-        data = r.json()
+        data = await _get_weather(loc)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Weather API error: {e}")
 
@@ -48,5 +99,5 @@ def assess(loc: Location):
 - Risk level (Low/Medium/High) on a single line as 'Risk: <level>'.
 - A concise 5-step response checklist for operations (numbered 1-5).
 - If High, include a <=200 char SMS/email alert text labeled 'ALERT:' on the last line."""
-    plan = complete(prompt, "You write concise, operations-focused incident responses.")
+    plan = await acomplete(prompt, "You write concise, operations-focused incident responses.")
     return {"metrics": summary, "plan": plan}
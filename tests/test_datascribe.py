@@ -5,9 +5,11 @@ We validate:
 - /query returns SQL and rows for a straightforward NL question.
 - It refuses non-SELECT SQL (very basic safety).
 """
+import functools
 import json
 from fastapi.testclient import TestClient
 from services.datascribe.app import app
+import services.datascribe.app as ds_app
 
 # Don't raise internal exceptions; we want HTTP status + body
 client = TestClient(app, raise_server_exceptions=False)
@@ -25,6 +27,23 @@ def _print_line(test_case: str, expected: str, actual: str) -> None:
     print(f"{test_case}, {expected}, {actual}")
 
 
+def _stub_llm(monkeypatch, answers: dict) -> list:
+    """
+    Replace the LLM call with a lookup in `answers` (question -> SQL) and start from an
+    empty translation cache. Returns the list of questions the stub was called with.
+    """
+
+    calls = []
+
+    async def _fake_acomplete(user_prompt, system_prompt=None, **kwargs):
+        calls.append(user_prompt)
+        return answers[user_prompt]
+
+    monkeypatch.setattr(ds_app, "acomplete", _fake_acomplete)
+    ds_app._SQL_CACHE.clear()
+    return calls
+
+
 def test_query_simple_aggregation():
     """
     Ask a simple analytics question and verify structured response.
@@ -65,3 +84,93 @@ def test_query_rejects_non_select():
     _print_line("test_query_rejects_non_select", expected, actual)
 
     assert r.status_code in (200, 400)
+
+
+def test_query_batch_returns_one_result_per_question(monkeypatch):
+    """
+    /query_batch answers each question independently; a failing item must not fail the batch.
+    """
+    calls = _stub_llm(monkeypatch, {
+        "batch: total quantity per sku": "SELECT sku, SUM(qty) AS total_qty FROM sales GROUP BY sku",
+        "batch: wipe the table": "DROP TABLE sales",
+    })
+    qs = [{"question": "batch: total quantity per sku"}, {"question": "batch: wipe the table"}]
+    r = client.post("/query_batch", json=qs)
+
+    body = _json_or_text(r)
+    expected = "status=200; [rows, status_code=400]"
+    actual = f"status={r.status_code}; body_type={type(body).__name__}"
+    _print_line("test_query_batch_returns_one_result_per_question", expected, actual)
+
+    assert r.status_code == 200
+    assert isinstance(body, list) and len(body) == 2
+    ok, bad = body
+    assert isinstance(ok["rows"], list) and len(ok["rows"]) > 0
+    assert bad["status_code"] == 400 and "error" in bad
+    assert sorted(calls) == sorted(q["question"] for q in qs)
+
+
+def test_guardrail_allows_keyword_substrings_in_identifiers(monkeypatch):
+    """
+    Column names like "updated_at" contain "update" but must not trip the DDL/DML guardrail.
+    """
+    _stub_llm(monkeypatch, {"guardrail: aliased column": "SELECT sku AS updated_at FROM sales"})
+    r = client.post("/query", json={"question": "guardrail: aliased column"})
+
+    _print_line("test_guardrail_allows_keyword_substrings_in_identifiers", "status=200", f"status={r.status_code}")
+    assert r.status_code == 200
+    assert "updated_at" in r.json()["rows"][0]
+
+
+def test_guardrail_rejects_whole_word_dml(monkeypatch):
+    """
+    A SELECT that carries a whole-word DDL/DML keyword is refused before execution.
+    """
+    _stub_llm(monkeypatch, {
+        "guardrail: delete": "SELECT 1 WHERE 1 AND delete",
+        "guardrail: drop": "SELECT sku FROM sales /* DROP TABLE sales */",
+    })
+    for question in ("guardrail: delete", "guardrail: drop"):
+        r = client.post("/query", json={"question": question})
+        _print_line("test_guardrail_rejects_whole_word_dml", "status=400", f"status={r.status_code}")
+        assert r.status_code == 400
+        assert r.json()["detail"]["message"] == "Refusing non-SELECT SQL for safety."
+
+
+def test_translation_cache_reuses_sql_for_repeat_questions(monkeypatch):
+    """
+    Case/whitespace variants of a question hit the cache; ?no_cache=true forces a fresh LLM call.
+    """
+    sql = "SELECT sku, SUM(qty) AS total_qty FROM sales GROUP BY sku"
+    calls = _stub_llm(monkeypatch, {
+        "cache: qty per sku": sql,
+        "Cache:  QTY per SKU": sql,
+    })
+
+    assert client.post("/query", json={"question": "cache: qty per sku"}).status_code == 200
+    assert client.post("/query", json={"question": "  Cache:  QTY per SKU "}).status_code == 200
+    _print_line("test_translation_cache_reuses_sql_for_repeat_questions", "llm_calls=1", f"llm_calls={len(calls)}")
+    assert len(calls) == 1
+
+    r = client.post("/query?no_cache=true", json={"question": "cache: qty per sku"})
+    assert r.status_code == 200
+    assert len(calls) == 2
+
+
+def test_translation_cache_evicts_sql_that_fails(monkeypatch):
+    """
+    SQL that passes the guardrails but fails to execute is not served from cache again,
+    and the error detail carries no traceback unless DATASCRIBE_DEBUG=1.
+    """
+    calls = _stub_llm(monkeypatch, {"cache: bad column": "SELECT no_such_column FROM sales"})
+    monkeypatch.delenv("DATASCRIBE_DEBUG", raising=False)
+    # Fresh settings cache so the unset DATASCRIBE_DEBUG is what gets read
+    monkeypatch.setattr(ds_app, "_config", functools.cache(ds_app._config.__wrapped__))
+
+    for _ in range(2):
+        r = client.post("/query", json={"question": "cache: bad column"})
+        assert r.status_code == 400
+        assert r.json()["detail"]["message"] == "SQL execution failed."
+        assert "traceback" not in r.json()["detail"]
+    _print_line("test_translation_cache_evicts_sql_that_fails", "llm_calls=2", f"llm_calls={len(calls)}")
+    assert len(calls) == 2
@@ -5,6 +5,7 @@ We validate:
 - /assess produces a metrics dict with certain keys
 - The plan contains a 'Risk:' line and numbered steps
 """
+import pytest
 from fastapi.testclient import TestClient
 from services.weather_emergency.app import app
 
@@ -25,3 +26,71 @@ def test_assess_basic():
     assert "tempC" in metrics and "wind" in metrics and "precipProb" in metrics
     assert isinstance(body["plan"], str)
     assert "Risk:" in body["plan"]  # The model is asked to produce this label
+
+
+def test_weather_fetches_are_coalesced_and_failures_not_cached(monkeypatch):
+    """
+    Concurrent requests for the same grid cell share one Open-Meteo fetch; a failed
+    fetch is not cached, so the next request tries again. (No network: fetch is stubbed.)
+    """
+    import asyncio
+    from cachetools import TTLCache
+    import services.weather_emergency.app as wx_app
+
+    calls = []
+    fail_next = [False]
+
+    async def _fake_fetch(lat, lon):
+        calls.append((lat, lon))
+        await asyncio.sleep(0.01)  # keep the fetch in flight while other callers arrive
+        if fail_next[0]:
+            raise RuntimeError("upstream down")
+        return {"current_weather": {"temperature": 30.0, "windspeed": 5.0}}
+
+    monkeypatch.setattr(wx_app, "_fetch_weather", _fake_fetch)
+    monkeypatch.setattr(wx_app, "_WX", TTLCache(maxsize=100, ttl=600))
+
+    async def scenario():
+        # 6 concurrent callers in the same ~1km cell -> 1 fetch
+        locs = [wx_app.Location(lat=17.3870, lon=78.4867)] * 3 + [wx_app.Location(lat=17.3881, lon=78.4872)] * 3
+        results = await asyncio.gather(*[wx_app._get_weather(loc) for loc in locs])
+        assert len(calls) == 1
+        assert all(r == results[0] for r in results)
+
+        # Failure in another cell propagates and is not stored
+        fail_next[0] = True
+        other = wx_app.Location(lat=40.7128, lon=-74.0060)
+        with pytest.raises(RuntimeError):
+            await wx_app._get_weather(other)
+        fail_next[0] = False
+        await wx_app._get_weather(other)
+        assert len(calls) == 3
+        assert wx_app._WX_INFLIGHT == {}
+
+    asyncio.run(scenario())
+
+
+def test_assess_survives_app_restart(monkeypatch):
+    """
+    Shutdown closes the shared Open-Meteo client; a later startup in the same process must
+    get a fresh one instead of a closed client. (No network: transport is mocked.)
+    """
+    import httpx
+    from cachetools import TTLCache
+    import services.weather_emergency.app as wx_app
+
+    def _handler(request):
+        return httpx.Response(200, json={"current_weather": {"temperature": 30.0, "windspeed": 5.0}})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        wx_app.httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(_handler))
+    )
+    monkeypatch.setattr(wx_app, "_WX", TTLCache(maxsize=100, ttl=600))
+    monkeypatch.setattr(wx_app, "_HTTP", None)  # drop any client left by earlier tests
+
+    for lat in (10.0, 20.0):  # different cells so each run really hits the client
+        with TestClient(wx_app.app) as c:
+            r = c.post("/assess", json={"lat": lat, "lon": 30.0})
+            assert r.status_code == 200
+        assert wx_app._HTTP is None